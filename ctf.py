@@ -1,82 +1,399 @@
 #!/usr/bin/env python3
 import subprocess
-import requests
 import sys
+import os
+import atexit
+import argparse
+import hashlib
 import shlex
 import re
-
-# Import rich for beautiful terminal formatting and Markdown rendering
-try:
-    from rich.console import Console
-    from rich.markdown import Markdown
-    from rich.panel import Panel
-except ImportError:
-    print("[!] The 'rich' library is required for enhanced readability.")
-    print("[!] Please install it using: pip install rich")
-    sys.exit(1)
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+import xml.etree.ElementTree as ET
 
 OLLAMA_API = "http://localhost:11434/api/generate"
 MODEL = "ctf-scanner"
-console = Console()
+OLLAMA_KEEP_ALIVE = "30m"  # Keep the model loaded between analyses
+NMAP_TIMEOUT = 3600
+NMAP_STATS_INTERVAL = "10s"
+FULL_SCAN_OPTIONS = ['-Pn', '-sV', '-sC', '-p-', '-T4']  # Run in two stages by run_scan
+MAX_SCAN_WORKERS = 8  # Parallel nmap processes in multi-target mode
+AI_WORKERS = 2        # Ollama is the bottleneck, so keep analyses few
+CACHE_DIR = os.path.expanduser("~/.cache/claudmap")
+CACHE_TTL = 24 * 60 * 60  # Seconds a cached scan/analysis stays fresh (--cache-ttl)
+MAX_SCRIPT_LINES = 8          # NSE output lines kept per script in the AI prompt
+MAX_PROMPT_SCAN_TOKENS = 5000  # Scan summary budget, leaving room for the answer
+CHARS_PER_TOKEN = 3           # Rough estimate for nmap output
+MAX_NUM_CTX = 8192
+# Only a couple of fixed num_ctx sizes, since Ollama reloads the model
+# whenever num_ctx changes between requests
+CONTEXT_SIZES = (4096, MAX_NUM_CTX)
+RESPONSE_TOKENS = 2048        # Context reserved for the model's answer
+
+class PlainConsole:
+    """Minimal stand-in for rich's Console, used by --plain and before startup"""
+    _MARKUP_RE = re.compile(r'\[/?[a-z][a-z ]*\]')
+    
+    def print(self, *objects):
+        print(*(self._MARKUP_RE.sub('', str(o)) for o in objects))
+    
+    def input(self, prompt=""):
+        return input(self._MARKUP_RE.sub('', prompt))
+
+class PlainProgress:
+    """No-op stand-in for rich's Progress in --plain mode"""
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def add_task(self, description, total=None):
+        return None
+    
+    def update(self, task, **fields):
+        pass
+    
+    def advance(self, task, advance=1):
+        pass
+
+# rich costs ~100 ms to import, so it is only loaded once main() knows
+# the output isn't --plain; --help and scripted runs never pay for it
+console = PlainConsole()
+
+def rich_console():
+    """Create a rich Console, exiting with install instructions if rich is missing"""
+    try:
+        from rich.console import Console
+    except ImportError:
+        print("[!] The 'rich' library is required for enhanced readability.")
+        print("[!] Please install it using: pip install rich (or run with --plain)")
+        sys.exit(1)
+    return Console()
+
+def plain_output():
+    """Whether output is going through PlainConsole rather than rich"""
+    return isinstance(console, PlainConsole)
+
+_BANNER = """
+╔═══════════════════════════════════════════════════════════════════╗
+║                   CTF ENUMERATION SCANNER                         ║
+║                 Powered by Ollama + qwen3:8b                      ║
+╚═══════════════════════════════════════════════════════════════════╝
+    """
+_BANNER_TEXT = None  # rich Text for _BANNER, created on first use
+
+# Reuse one keep-alive connection pool for all Ollama API calls. requests is
+# only needed once a scan reaches the AI step, so it is imported on first use.
+SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+def ollama_session():
+    """Shared requests.Session for the Ollama API, created on first use"""
+    global SESSION
+    with _SESSION_LOCK:
+        if SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            SESSION = requests.Session()
+            SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=0))
+            SESSION.headers.update({'Connection': 'keep-alive', 'Accept-Encoding': 'gzip, deflate'})
+            atexit.register(SESSION.close)
+    return SESSION
+
+# nmap reports --stats-every progress in its XML stream as <taskprogress> elements
+_PROGRESS_RE = re.compile(r'<taskprogress task="(?P<task>[^"]*)"[^>]*?percent="(?P<percent>[\d.]+)"')
+
+def parse_scan(scan_output):
+    """Parse nmap XML output, returning None if it is missing or malformed"""
+    if not scan_output or not scan_output.strip():
+        return None
+    try:
+        return ET.fromstring(scan_output)
+    except ET.ParseError:
+        return None
+
+def open_ports(root):
+    """List the port numbers nmap reported as open"""
+    return [port.get('portid') for port in root.iter('port')
+            if port.find('state') is not None and port.find('state').get('state') == 'open']
+
+def format_scan(root, max_script_lines=None):
+    """Render the useful parts of a parsed scan as compact text"""
+    lines = []
+    for host in root.iter('host'):
+        address = host.find('address').get('addr')
+        names = [h.get('name') for h in host.iterfind('hostnames/hostname')]
+        state = host.find('status').get('state')
+        lines.append(f"Host: {address}" + (f" ({', '.join(names)})" if names else "") + f" is {state}")
+        
+        for extra in host.iterfind('ports/extraports'):
+            lines.append(f"Not shown: {extra.get('count')} {extra.get('state')} ports")
+        
+        for port in host.iterfind('ports/port'):
+            if port.find('state').get('state') != 'open':
+                continue
+            service = port.find('service')
+            name, version = 'unknown', ''
+            if service is not None:
+                name = service.get('name', 'unknown')
+                version = ' '.join(filter(None, (service.get('product'), service.get('version'))))
+                if service.get('extrainfo'):
+                    version += f" ({service.get('extrainfo')})"
+            lines.append(f"{port.get('portid')}/{port.get('protocol')} open {name} {version}".rstrip())
+            for script in port.iterfind('script'):
+                lines.extend(_format_script(script, max_script_lines))
+        
+        for script in host.iterfind('hostscript/script'):
+            lines.extend(_format_script(script, max_script_lines))
+        for match in host.iterfind('os/osmatch'):
+            lines.append(f"OS guess: {match.get('name')} ({match.get('accuracy')}%)")
+        lines.append("")
+    
+    return "\n".join(lines).strip()
+
+def _format_script(script, max_lines=None):
+    """Render NSE script output in nmap's '|' style"""
+    output = [line.strip() for line in script.get('output', '').strip().splitlines() if line.strip()]
+    if not output:
+        return [f"| {script.get('id')}"]
+    lines = [f"| {script.get('id')}: {output[0]}"] + [f"|   {line}" for line in output[1:]]
+    if max_lines is not None and len(lines) > max_lines:
+        lines = lines[:max_lines] + [f"|   ... ({len(lines) - max_lines} more lines)"]
+    return lines
+
+def scan_summary(scan_output, max_script_lines=None):
+    """Compact text summary of nmap XML output, or the raw output if unparseable"""
+    root = parse_scan(scan_output)
+    return format_scan(root, max_script_lines) if root is not None else scan_output
+
+def prompt_summary(scan_output):
+    """Scan summary trimmed to fit the model's context window"""
+    # Long NSE dumps (banners, certificates, directory listings) add little
+    # for the model but can push the open-port list out of the context
+    summary = scan_summary(scan_output, MAX_SCRIPT_LINES)
+    budget = MAX_PROMPT_SCAN_TOKENS * CHARS_PER_TOKEN
+    if len(summary) > budget:
+        cut = summary.rfind('\n', 0, budget)
+        summary = summary[:cut if cut > 0 else budget] + "\n... (truncated)"
+    return summary
 
 def check_scan_results(scan_output):
     """Check if scan found anything useful"""
-    if not scan_output or len(scan_output.strip()) < 50:
+    root = parse_scan(scan_output)
+    if root is None:
         return False, "Scan produced no output"
     
     # Check if host appears down
-    if "Host seems down" in scan_output or "0 hosts up" in scan_output:
+    hosts = root.find('runstats/hosts')
+    if hosts is not None and hosts.get('up') == '0':
         return False, "Host appears down (try -Pn flag)"
     
     # Check if any ports were found
-    open_ports = re.findall(r'(\d+)/tcp\s+open', scan_output)
-    if not open_ports:
+    ports = open_ports(root)
+    if not ports:
         # Check for closed/filtered
-        if "filtered" in scan_output.lower() or "closed" in scan_output.lower():
+        if root.find('.//extraports') is not None or root.find('.//port') is not None:
             return False, "No open ports found (all ports closed/filtered)"
         return False, "No ports detected in scan output"
     
-    return True, f"Found {len(open_ports)} open port(s): {', '.join(open_ports)}"
+    return True, f"Found {len(ports)} open port(s): {', '.join(ports)}"
+
+def _cache_path(target, options):
+    """Cache file for a target/options pair"""
+    key = hashlib.sha1((target + '\x00' + ' '.join(options)).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.xml")
+
+def _ai_cache_path(prompt):
+    """Cache file for an AI analysis of a prompt"""
+    key = hashlib.sha256((MODEL + '\x00' + prompt).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, "ai", f"{key}.md")
+
+def _cache_get(path):
+    """Return a cached entry if it is still fresh, else None"""
+    if CACHE_TTL <= 0:
+        return None
+    try:
+        if time.time() - os.path.getmtime(path) > CACHE_TTL:
+            return None
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _cache_put(path, text):
+    """Store an entry in the cache, ignoring filesystem errors"""
+    if CACHE_TTL <= 0:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
 
-def run_nmap(target, options):
-    """Run nmap scan with specified options"""
-    cmd = ['nmap'] + options + [target]
+def scan_progress():
+    """Progress display for running nmap scans"""
+    if plain_output():
+        return PlainProgress()
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeElapsedColumn
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[bold yellow]{task.description}"),
+        BarColumn(),
+        TextColumn("{task.percentage:>3.0f}%"),
+        TimeElapsedColumn(),
+        console=console
+    )
+
+# Running nmap processes and a stop flag, so Ctrl-C in batch mode can end the
+# scans already in flight instead of waiting for them
+_running_scans = set()
+_running_scans_lock = threading.Lock()
+_interrupted = threading.Event()
+
+def stop_running_work():
+    """Kill running nmap scans and make in-flight analyses bail out"""
+    _interrupted.set()
+    with _running_scans_lock:
+        for proc in _running_scans:
+            proc.kill()
+
+def run_nmap(target, options, progress=None):
+    """Run nmap scan with specified options, returning its XML output"""
+    cmd = ['nmap'] + options + ['--stats-every', NMAP_STATS_INTERVAL, '-oX', '-', target]
+    
+    cached = _cache_get(_cache_path(target, options))
+    if cached is not None:
+        console.print(f"\n[bold blue][*] Using cached scan:[/bold blue] {' '.join(cmd)}")
+        console.print("[dim]Pass --cache-ttl 0 to force a fresh scan[/dim]")
+        _, message = check_scan_results(cached)
+        console.print(f"[bold green]✓ {message}[/bold green]")
+        return cached, None
+    
     console.print(f"\n[bold blue][*] Running:[/bold blue] {' '.join(cmd)}")
     
-    # Using rich's built-in status spinner for cleaner terminal output
-    with console.status("[bold yellow]Scanning (this may take a while)...", spinner="dots"):
+    # Drive a progress bar from nmap's periodic stats so long scans don't look
+    # stuck. Only one live display can be active, so batch mode shares one.
+    own_progress = progress is None
+    if own_progress:
+        progress = scan_progress()
+    with progress if own_progress else nullcontext():
+        task = progress.add_task(f"{target}: starting", total=100)
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)
+            timed_out = threading.Event()
+            lines = []
+            stderr_lines = []
+            
+            with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                  text=True, bufsize=1) as proc:
+                with _running_scans_lock:
+                    _running_scans.add(proc)
+                    if _interrupted.is_set():
+                        proc.kill()
+                
+                def kill_on_timeout():
+                    timed_out.set()
+                    proc.kill()
+                
+                timer = threading.Timer(NMAP_TIMEOUT, kill_on_timeout)
+                timer.start()
+                # Drain stderr separately so a chatty nmap can't fill the pipe and stall
+                drain = threading.Thread(target=lambda: stderr_lines.extend(proc.stderr), daemon=True)
+                drain.start()
+                try:
+                    for line in proc.stdout:
+                        lines.append(line)
+                        match = _PROGRESS_RE.search(line)
+                        if match:
+                            progress.update(task, description=f"{target}: {match['task']}",
+                                            completed=float(match['percent']))
+                    returncode = proc.wait()
+                    drain.join()
+                finally:
+                    timer.cancel()
+                    with _running_scans_lock:
+                        _running_scans.discard(proc)
             
-            if result.returncode != 0:
-                console.print(f"[bold red]✗ Scan failed with return code {result.returncode}[/bold red]")
-                if result.stderr:
-                    console.print(f"[dim red]Error: {result.stderr}[/dim red]")
+            if _interrupted.is_set():
+                return None, "Interrupted"
+            
+            if timed_out.is_set():
+                console.print(f"[bold red]✗ Scan timed out after {NMAP_TIMEOUT // 60} minutes[/bold red]")
+                return None, "Timeout"
+            
+            stdout = ''.join(lines)
+            
+            if returncode != 0:
+                console.print(f"[bold red]✗ Scan failed with return code {returncode}[/bold red]")
+                if stderr_lines:
+                    console.print(f"[dim red]Error: {''.join(stderr_lines)}[/dim red]")
                 return None, "Scan failed"
             
             # Validate scan results
-            is_valid, message = check_scan_results(result.stdout)
+            is_valid, message = check_scan_results(stdout)
+            
+            progress.update(task, description=f"{target}: done", completed=100)
             
             if is_valid:
                 console.print(f"[bold green]✓ Scan complete! {message}[/bold green]")
-                return result.stdout, None
+                _cache_put(_cache_path(target, options), stdout)
+                return stdout, None
             else:
                 console.print(f"[bold yellow]⚠ Scan completed but: {message}[/bold yellow]")
-                return result.stdout, message
+                return stdout, message
                 
-        except subprocess.TimeoutExpired:
-            console.print("[bold red]✗ Scan timed out after 1 hour[/bold red]")
-            return None, "Timeout"
         except Exception as e:
             console.print(f"[bold red]✗ Error: {e}[/bold red]")
             return None, str(e)
 
-def analyze_scan(scan_results, target):
-    """Analyze scan with AI"""
+def run_scan(target, options, progress=None):
+    """Run a scan, splitting the built-in CTF Full Scan into two stages"""
+    # Service/script detection against all 65,535 ports is slow; find the open
+    # ports with a fast SYN sweep first and only fingerprint those. Custom
+    # flags run as given, since a rebuilt discovery sweep could drop options
+    # like -6, -e or -sU that the user's scan depends on.
+    if options != FULL_SCAN_OPTIONS:
+        return run_nmap(target, options, progress)
+    
+    discovery = ['-Pn', '-p-', '--min-rate', '5000', '-T4']
+    scan_results, error = run_nmap(target, discovery, progress)
+    if not scan_results or error:
+        return scan_results, error
+    
+    ports = ','.join(open_ports(parse_scan(scan_results)))
+    options = [f'-p{ports}' if o == '-p-' else o for o in options]
+    return run_nmap(target, options, progress)
+
+def warm_model(num_ctx):
+    """Load the model into memory ahead of the first analysis"""
+    # A generate request without a prompt makes Ollama load the model and return.
+    # num_ctx must match the analyses, or Ollama reloads the model for them.
+    payload = {'model': MODEL, 'keep_alive': OLLAMA_KEEP_ALIVE, 'options': {'num_ctx': num_ctx}}
+    try:
+        ollama_session().post(OLLAMA_API, json=payload, timeout=300).close()
+    except Exception:
+        pass
+
+def context_size(prompt):
+    """Smallest of CONTEXT_SIZES that fits the prompt and an answer"""
+    # Ollama sizes the KV cache by num_ctx, not by the actual prompt, so a
+    # short scan shouldn't pay for the full window
+    needed = len(prompt) // CHARS_PER_TOKEN + RESPONSE_TOKENS
+    return next((size for size in CONTEXT_SIZES if size >= needed), MAX_NUM_CTX)
+
+def analyze_scan(scan_results, target, show_live=True, num_ctx=None):
+    """Analyze scan with AI, sizing num_ctx to the prompt unless one is given"""
     prompt = f"""Target: {target}
 
 Nmap Scan Results:
-{scan_results}
+{prompt_summary(scan_results)}
 
 Analyze this scan thoroughly:
 1. List all open ports with services and versions
@@ -89,68 +406,164 @@ Analyze this scan thoroughly:
 Be comprehensive and actionable. Format with clear markdown headings.
 """
     
+    cache_path = _ai_cache_path(prompt)
+    cached = _cache_get(cache_path)
+    if cached is not None:
+        if show_live:
+            show_analysis(cached, target)
+        console.print(f"[bold green]✓ Using cached analysis for {target}[/bold green]\n")
+        return cached
+    
     payload = {
         'model': MODEL,
         'prompt': prompt,
-        'stream': False,
+        'stream': True,
+        'keep_alive': OLLAMA_KEEP_ALIVE,
         'options': {
-            'num_ctx': 8192,
+            'num_ctx': num_ctx or context_size(prompt),
             'temperature': 0.7
         }
     }
     
-    with console.status("[bold yellow]Analyzing with AI (30-90 seconds)...", spinner="dots"):
-        try:
-            response = requests.post(OLLAMA_API, json=payload, timeout=300)
-            if response.status_code == 200:
-                console.print("[bold green]✓ Analysis complete![/bold green]\n")
-                return response.json()['response']
-            else:
+    # orjson is optional; it parses the streamed NDJSON chunks several times
+    # faster. Imported here so runs that never reach the AI step skip it.
+    try:
+        from orjson import loads as json_loads
+    except ImportError:
+        from json import loads as json_loads
+    
+    # Stream NDJSON chunks and render the analysis as it is generated
+    buffer = []
+    done = False
+    try:
+        with ollama_session().post(OLLAMA_API, json=payload, timeout=300, stream=True) as response:
+            if response.status_code != 200:
                 return f"Error: {response.status_code}"
-        except Exception as e:
-            return f"Error: {e}"
+            
+            live = None
+            if show_live and not plain_output():
+                from rich.live import Live
+                # Keep the default "ellipsis" overflow while streaming: "visible"
+                # can't clear lines that scrolled off and re-prints the panel on
+                # every refresh. Live.stop() prints the full panel once at the end.
+                live = Live(analysis_panel("", target), console=console, refresh_per_second=20)
+            with live or nullcontext():
+                last_update = 0.0
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    if _interrupted.is_set():
+                        return "Error: Interrupted"
+                    chunk = json_loads(line)
+                    if 'error' in chunk:
+                        return f"Error: {chunk['error']}"
+                    text = chunk.get('response', '')
+                    buffer.append(text)
+                    if show_live and live is None:
+                        # --plain: stream the raw Markdown straight to the terminal
+                        sys.stdout.write(text)
+                        sys.stdout.flush()
+                    
+                    # Re-render at most every 50 ms; Markdown parsing is not free
+                    now = time.monotonic()
+                    if live and now - last_update >= 0.05:
+                        live.update(analysis_panel("".join(buffer), target))
+                        last_update = now
+                    
+                    if chunk.get('done'):
+                        done = True
+                        break
+                
+                analysis = "".join(buffer)
+                if live:
+                    live.update(analysis_panel(analysis, target))
+                elif show_live:
+                    print()
+        
+        # Only complete responses are cached, never a stream cut off midway
+        if done:
+            _cache_put(cache_path, analysis)
+        console.print(f"[bold green]✓ Analysis complete for {target}![/bold green]\n")
+        return analysis
+    except Exception as e:
+        return f"Error: {e}"
+
+def show_analysis(analysis, target):
+    """Print a finished AI analysis"""
+    if plain_output():
+        print(f"\n=== AI Analysis for {target} ===\n\n{analysis}\n")
+    else:
+        console.print(analysis_panel(analysis, target))
+
+def analysis_panel(analysis, target):
+    """Wrap AI analysis in a bordered Markdown panel"""
+    from rich.markdown import Markdown
+    from rich.panel import Panel
+    
+    return Panel(
+        Markdown(analysis),
+        title=f"[bold cyan]AI Analysis for {target}[/bold cyan]",
+        border_style="cyan",
+        expand=False
+    )
 
 def save_results(target, scan_results, analysis):
     """Save results to markdown file"""
     safe_target = target.replace(".", "_").replace("/", "_")
     filename = f'analysis_{safe_target}.md'
     
-    with open(filename, 'w') as f:
-        f.write(f"# CTF Enumeration: {target}\n\n---\n\n")
-        f.write(analysis)
-        f.write("\n\n---\n\n## Raw Nmap Scan\n\n```text\n")
-        f.write(scan_results)
-        f.write("\n```\n")
+    # Build the whole document up front so it goes out in a single write
+    document = (
+        f"# CTF Enumeration: {target}\n\n---\n\n"
+        f"{analysis}\n\n---\n\n## Nmap Scan Summary\n\n```text\n"
+        f"{scan_summary(scan_results)}\n```\n\n"
+        f"## Raw Nmap XML\n\n```xml\n"
+        f"{scan_results.strip()}\n```\n"
+    )
+    with open(filename, 'w', buffering=1 << 20) as f:
+        f.write(document)
         
     return filename
 
 def print_banner():
     """Print stylized banner"""
-    banner = """
-╔═══════════════════════════════════════════════════════════════════╗
-║                   CTF ENUMERATION SCANNER                         ║
-║                 Powered by Ollama + qwen3:8b                      ║
-╚═══════════════════════════════════════════════════════════════════╝
-    """
-    console.print(f"[bold cyan]{banner}[/bold cyan]")
-
-def main():
-    print_banner()
-    
-    # Get target
-    if len(sys.argv) > 1:
-        target = sys.argv[1]
-    else:
-        target = console.input("[bold green]Target IP/hostname:[/bold green] ").strip()
-    
-    if not target:
-        console.print("[bold red]Error: No target specified[/bold red]")
+    global _BANNER_TEXT
+    if plain_output():
+        print(_BANNER)
         return
-    
-    # Ask for scan options
+    # Built once as a plain Text with a style, so rich has no markup to parse
+    if _BANNER_TEXT is None:
+        from rich.text import Text
+        _BANNER_TEXT = Text(_BANNER, style="bold cyan")
+    console.print(_BANNER_TEXT)
+
+# nmap output options (-oN file, -oX file, -oG -, -oA base, ...). run_nmap reads
+# XML from stdout, so user-chosen outputs would corrupt or clash with it.
+_OUTPUT_OPTION_RE = re.compile(r'-o[NXSGAM]')
+
+def strip_output_options(options):
+    """Split nmap options into (kept, removed output options)"""
+    kept, removed = [], []
+    args = iter(options)
+    for option in args:
+        if _OUTPUT_OPTION_RE.fullmatch(option):
+            # The filename follows as the next argument
+            removed.append(f"{option} {next(args, '')}".strip())
+        elif _OUTPUT_OPTION_RE.match(option):
+            removed.append(option)
+        else:
+            kept.append(option)
+    return kept, removed
+
+def skips_host_discovery(options):
+    """Whether the nmap options include -Pn"""
+    return any(o.startswith('-Pn') for o in options)
+
+def select_scan_options():
+    """Prompt for a scan mode and return the matching nmap options"""
     console.print("\n[bold cyan]Select scan mode:[/bold cyan]")
     console.print("  1. Quick scan (-Pn -sV -sC, top 1000 ports, ~1-2 min)")
-    console.print("  2. [bold yellow]CTF Full Scan[/bold yellow] (-Pn -sV -sC -p-, all ports, ~10-20 min) [RECOMMENDED]")
+    console.print("  2. [bold yellow]CTF Full Scan[/bold yellow] (-Pn -sV -sC -p-, all ports in two stages, ~1-3 min) [RECOMMENDED]")
     console.print("  3. Aggressive (-Pn -A -T4, includes OS detection)")
     console.print("  4. Specific ports (-Pn -sV -sC -p <your ports>)")
     console.print("  5. Custom flags (manual entry)")
@@ -161,8 +574,8 @@ def main():
     if choice == "1":
         options = ['-Pn', '-sV', '-sC', '-T4']
     elif choice == "2":
-        options = ['-Pn', '-sV', '-sC', '-p-', '-T4']
-        console.print("[bold yellow]⚠ Scanning all 65,535 ports. This will take 10-20 minutes.[/bold yellow]")
+        options = list(FULL_SCAN_OPTIONS)
+        console.print("[bold yellow]⚠ Scanning all 65,535 ports, then fingerprinting the open ones. This may take a few minutes.[/bold yellow]")
     elif choice == "3":
         options = ['-Pn', '-A', '-T4']
     elif choice == "4":
@@ -175,21 +588,27 @@ def main():
         console.print("[dim]Tip: Always include -Pn for CTF boxes[/dim]")
         custom_flags = console.input("[bold green]Flags:[/bold green] ").strip()
         if custom_flags:
-            options = shlex.split(custom_flags)
-            # Auto-add -Pn if not present
-            if '-Pn' not in options:
+            options, removed = strip_output_options(shlex.split(custom_flags))
+            if removed:
+                console.print(f"[bold yellow]⚠ Ignoring output options ({', '.join(removed)}): "
+                              f"results are read from nmap's XML and saved to the report[/bold yellow]")
+            # Auto-add -Pn if not present (also as part of a combined flag like -PnsV)
+            if not skips_host_discovery(options):
                 options.insert(0, '-Pn')
         else:
             options = ['-Pn', '-sV', '-sC']
     else:
         console.print("[bold red]Invalid choice, using CTF Full Scan[/bold red]")
-        options = ['-Pn', '-sV', '-sC', '-p-', '-T4']
-    
-    # Remove duplicates
-    options = list(dict.fromkeys(options))
+        options = list(FULL_SCAN_OPTIONS)
     
+    # Remove duplicates, keeping first-seen order
+    seen = set()
+    return [o for o in options if not (o in seen or seen.add(o))]
+
+def scan_target(target, options, force_ai=False):
+    """Scan a single target and interactively analyze the results"""
     # Run scan
-    scan_results, error = run_nmap(target, options)
+    scan_results, error = run_scan(target, options)
     
     # Check if scan was successful
     if not scan_results or error:
@@ -199,7 +618,7 @@ def main():
         
         if scan_results:
             console.print("[bold yellow]Scan output:[/bold yellow]")
-            console.print(f"[dim]{scan_results[:500]}...[/dim]\n")
+            console.print(f"[dim]{scan_summary(scan_results)[:500]}...[/dim]\n")
         
         console.print("[bold cyan]Troubleshooting suggestions:[/bold cyan]")
         console.print("  • Check VPN connection: [dim]ip a | grep tun[/dim]")
@@ -208,8 +627,12 @@ def main():
         console.print("  • Verify correct IP address")
         console.print("  • Try slower scan: [dim]nmap -Pn -sV -sC -T2 TARGET[/dim]")
         
-        # Ask if user wants to proceed anyway
-        if scan_results and "No open ports" not in str(error):
+        # A scan with no open ports gives the model nothing to work with, so
+        # only --force-ai sends it; other failures can be overridden here
+        if scan_results and force_ai and "No open ports" in str(error):
+            console.print("\n[bold yellow]⚠ --force-ai given, analyzing anyway[/bold yellow]")
+        elif scan_results and "No open ports" not in str(error):
+            # Ask if user wants to proceed anyway
             proceed = console.input("\n[bold yellow]Proceed with AI analysis anyway? (y/n):[/bold yellow] ").strip().lower()
             if proceed != 'y':
                 return
@@ -227,18 +650,102 @@ def main():
         console.print(f"\n[bold red]{analysis}[/bold red]")
         return
 
-    # Display the final AI Analysis wrapped in a bordered Markdown panel
-    console.print(Panel(
-        Markdown(analysis), 
-        title=f"[bold cyan]AI Analysis for {target}[/bold cyan]", 
-        border_style="cyan",
-        expand=False
-    ))
-    
     # Save
     filename = save_results(target, scan_results, analysis)
     console.print(f"\n[bold green]✓ Results saved to:[/bold green] [bold white]{filename}[/bold white]\n")
 
+def scan_targets(targets, options, force_ai=False):
+    """Scan several targets in parallel, analyzing each scan as it finishes"""
+    console.print(f"\n[bold cyan][*] Scanning {len(targets)} targets in parallel[/bold cyan]")
+    saved = []
+    
+    # nmap blocks on external I/O, so threads scale fine despite the GIL.
+    # Analyses go to a smaller pool and overlap with the remaining scans.
+    with scan_progress() as progress, \
+            ThreadPoolExecutor(max_workers=min(MAX_SCAN_WORKERS, len(targets))) as scan_pool, \
+            ThreadPoolExecutor(max_workers=AI_WORKERS) as ai_pool:
+        # Load the model while nmap runs so the first analysis doesn't wait for it.
+        # Every request in the batch uses the same num_ctx so it stays loaded.
+        ai_pool.submit(warm_model, MAX_NUM_CTX)
+        scans = {scan_pool.submit(run_scan, target, options, progress): target for target in targets}
+        analyses = {}
+        ai_task = progress.add_task("AI analysis", total=0)
+        
+        try:
+            for future in as_completed(scans):
+                target = scans[future]
+                scan_results, error = future.result()
+                forced = force_ai and "No open ports" in str(error)
+                if not scan_results or (error and not forced):
+                    console.print(f"[bold red]✗ Skipping AI analysis for {target}: {error or 'no scan output'}[/bold red]")
+                    continue
+                analyses[ai_pool.submit(analyze_scan, scan_results, target, False, MAX_NUM_CTX)] = (target, scan_results)
+                progress.update(ai_task, total=len(analyses))
+            
+            # Results are displayed and written from the main thread only
+            for future in as_completed(analyses):
+                target, scan_results = analyses[future]
+                analysis = future.result()
+                progress.advance(ai_task)
+                if analysis.startswith("Error:"):
+                    console.print(f"[bold red]✗ {target}: {analysis}[/bold red]")
+                    continue
+                
+                show_analysis(analysis, target)
+                saved.append(save_results(target, scan_results, analysis))
+        except KeyboardInterrupt:
+            # Leaving the with-block waits for every queued future, so drop the
+            # queues and kill the scans already running before re-raising
+            scan_pool.shutdown(wait=False, cancel_futures=True)
+            ai_pool.shutdown(wait=False, cancel_futures=True)
+            stop_running_work()
+            raise
+    
+    console.print(f"\n[bold green]✓ {len(saved)}/{len(targets)} target(s) analyzed[/bold green]")
+    for filename in saved:
+        console.print(f"  • [bold white]{filename}[/bold white]")
+    console.print()
+
+def parse_args():
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(description="CTF enumeration scanner powered by nmap + Ollama")
+    parser.add_argument('targets', nargs='*', help="target IPs/hostnames (prompted for if omitted)")
+    parser.add_argument('--cache-ttl', type=int, default=CACHE_TTL, metavar='SECONDS',
+                        help=f"reuse cached scans and analyses younger than this (default: {CACHE_TTL}, 0 disables)")
+    parser.add_argument('--force-ai', action='store_true',
+                        help="run the AI analysis even when the scan found no open ports")
+    parser.add_argument('--plain', action='store_true',
+                        help="plain text output without rich (faster startup, script-friendly)")
+    return parser.parse_args()
+
+def main():
+    global CACHE_TTL, console
+    
+    args = parse_args()
+    CACHE_TTL = args.cache_ttl
+    if not args.plain:
+        console = rich_console()
+    
+    print_banner()
+    
+    # Get targets
+    targets = args.targets
+    if not targets:
+        target = console.input("[bold green]Target IP/hostname:[/bold green] ").strip()
+        if target:
+            targets = [target]
+    
+    if not targets:
+        console.print("[bold red]Error: No target specified[/bold red]")
+        return
+    
+    options = select_scan_options()
+    
+    if len(targets) == 1:
+        scan_target(targets[0], options, args.force_ai)
+    else:
+        scan_targets(targets, options, args.force_ai)
+
 if __name__ == "__main__":
     try:
         main()